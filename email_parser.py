@@ -4,7 +4,11 @@ Extracts task status, repository, summary, and links from email content.
 """
 
 import re
-from bs4 import BeautifulSoup
+import hashlib
+from html import unescape
+
+import lxml.html
+from lxml import etree
 
 
 # Status keywords to look for in Jules emails
@@ -46,13 +50,75 @@ STATUS_PATTERNS = {
     ],
 }
 
+# Lower-case literal fragments contained in every match of each status's
+# patterns. A cheap substring check on these rules out buckets that cannot
+# match before any regex runs. Keep in sync with STATUS_PATTERNS.
+_STATUS_STEMS = {
+    "completed": ("complet", "finished", "done", "merged", "success"),
+    "failed": ("failed", "error", "unable", "could", "unsuccessful"),
+    "needs_review": ("review", "waiting", "pending", "pull", "change"),
+    "in_progress": ("started", "working", "progress", "processing", "running"),
+    "cancelled": ("cancel", "stopped", "aborted"),
+}
+
+
+# Each status pattern compiled once at import. Case-sensitive on purpose:
+# callers pass already lower-cased text. Patterns are kept separate (rather
+# than one big alternation) so overlapping keywords are each counted and
+# re can use its literal-prefix search for every pattern.
+_STATUS_RES = {
+    status: [re.compile(pattern) for pattern in patterns]
+    for status, patterns in STATUS_PATTERNS.items()
+}
+
+
+# Common subject prefixes, compiled once at import and stripped in one
+# anchored pass (repeated so stacked prefixes like "[Jules] Jules: ..."
+# are all removed)
+_SUBJECT_PREFIX_RE = re.compile(
+    r"^\s*(?:\[Jules\]\s*|Jules:\s*|Google Jules\s*[-–—:]\s*)+",
+    re.IGNORECASE,
+)
+
+# GitHub-style repo references (owner/repo), matched against lower-cased text.
+# Segments are bounded by GitHub's own limits (39-char owners, 100-char repo
+# names) so long dotted tokens can't backtrack badly, and must not run on
+# into more name characters, so over-long names are rejected rather than
+# truncated. All forms share one alternation so the text is searched once.
+_REPO_RE = re.compile(
+    r"(?:repository|repo|github\.com)[:/\s]+([a-z0-9_.-]{1,39}/[a-z0-9_.-]{1,100})(?![a-z0-9_.-])"
+    r"|(?<![a-z0-9_.-])([a-z0-9_.-]{1,39}/[a-z0-9_.-]{1,100})\s+repository"
+)
+_SUBJECT_REPO_RE = re.compile(
+    r"(?<![a-zA-Z0-9_.-])([a-zA-Z0-9_.-]{1,39}/[a-zA-Z0-9_.-]{1,100})(?![a-zA-Z0-9_.-])"
+)
+
+_URL_RE = re.compile(r"https?://[^\s<>\"')\]]+")
+_NEWLINES_RE = re.compile(r"\n{3,}")
+
+# Shared HTML parser that always decodes its input as UTF-8
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+# Anchor hrefs that look like Jules task links, matched case-insensitively
+# (XPath 1.0 has no lower-case(), hence translate()).
+_LOWER_HREF = "translate(@href, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+_JULES_LINK_XPATH = etree.XPath(
+    f"//a[contains({_LOWER_HREF}, 'jules') or contains({_LOWER_HREF}, 'github.com')]/@href"
+)
+
+# Recently parsed results keyed by a hash of the email content, so emails
+# seen again (e.g. after a failed notification) aren't re-parsed.
+# Plain dict used as a FIFO: the oldest entry is evicted first.
+_PARSE_CACHE = {}
+_PARSE_CACHE_SIZE = 256
+
 
 def parse_jules_email(email_data: dict) -> dict:
     """
     Parse a Jules notification email and extract structured information.
 
     Args:
-        email_data: Dict from GmailClient.get_email_content() with keys:
+        email_data: Dict from GmailClient.get_email_full() or get_email_metadata() with keys:
             subject, snippet, body_html, body_text
 
     Returns:
@@ -69,94 +135,148 @@ def parse_jules_email(email_data: dict) -> dict:
     body_html = email_data.get("body_html", "")
     body_text = email_data.get("body_text", "")
 
-    # Parse HTML body for cleaner text extraction
+    cache_key = _cache_key(subject, snippet, body_html, body_text)
+    cached = _PARSE_CACHE.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
+    # Parse HTML body once for both cleaner text extraction and links
     body_plain = body_text
+    links = []
     if body_html:
-        body_plain = _html_to_text(body_html)
+        body_plain, links = _parse_html(body_html)
 
     # Combine all text for analysis
     full_text = f"{subject} {snippet} {body_plain}".lower()
 
+    # Subject and snippet usually settle the status on their own; only
+    # scan the whole body when they don't point clearly at one status
+    status = _dominant_status(f"{subject} {snippet}".lower())
+    if status == "unknown":
+        status = _detect_status(full_text)
+
     result = {
-        "status": _detect_status(full_text),
+        "status": status,
         "title": _clean_subject(subject),
         "repo": _extract_repo(full_text, subject),
         "summary": _build_summary(snippet, body_plain),
-        "link": _extract_jules_link(body_html, body_plain),
+        "link": _extract_jules_link(links, body_plain) or _extract_jules_link([], snippet),
         "raw_subject": subject,
     }
 
-    return result
+    if len(_PARSE_CACHE) >= _PARSE_CACHE_SIZE:
+        del _PARSE_CACHE[next(iter(_PARSE_CACHE))]
+    _PARSE_CACHE[cache_key] = result
+
+    return dict(result)
+
 
+def _cache_key(*parts: str) -> bytes:
+    """Hash the email content fields into a compact parse-cache key."""
+    data = "\0".join(parts).encode("utf-8", errors="surrogatepass")
+    return hashlib.sha1(data).digest()
+
+
+def _parse_html(html: str) -> tuple:
+    """
+    Parse the HTML email body once and pull out everything we need from it.
 
-def _html_to_text(html: str) -> str:
-    """Convert HTML email body to plain text."""
+    Returns:
+        Tuple of (plain_text, links) where links lists the hrefs that look
+        like Jules task links, in document order. ("", []) if the body
+        is empty or cannot be parsed.
+    """
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        # Parse UTF-8 bytes with a fixed encoding: lxml rejects str input
+        # carrying an XML encoding declaration, and <meta charset> must not
+        # override the encoding Gmail already decoded from
+        tree = lxml.html.fromstring(html.encode("utf-8", errors="replace"), parser=_HTML_PARSER)
 
-        # Remove script and style elements
-        for tag in soup(["script", "style", "head"]):
-            tag.decompose()
+        links = [str(href) for href in _JULES_LINK_XPATH(tree)]
 
-        text = soup.get_text(separator="\n", strip=True)
+        # Remove script and style elements. clear() keeps each tail as its
+        # own text node (strip_elements would glue it onto the previous one)
+        for tag in list(tree.iter("script", "style", "head")):
+            tag.clear(keep_tail=True)
+
+        text = "\n".join(piece.strip() for piece in tree.itertext() if piece.strip())
 
         # Collapse multiple newlines
-        text = re.sub(r"\n{3,}", "\n\n", text)
-        return text.strip()
+        text = _NEWLINES_RE.sub("\n\n", text)
+        return text.strip(), links
     except Exception:
-        return html
+        # Empty or unparseable body: never leak raw markup into the text
+        return "", []
 
 
 def _detect_status(text: str) -> str:
     """
-    Detect the Jules task status from email text.
+    Detect the Jules task status from lower-cased email text.
     Returns the most likely status based on keyword matching.
     """
-    scores = {}
+    return _top_status(_score_status(text))
 
-    for status, patterns in STATUS_PATTERNS.items():
-        score = 0
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            score += len(matches)
-        if score > 0:
-            scores[status] = score
 
-    if not scores:
+def _dominant_status(text: str) -> str:
+    """
+    Return the status only if it clearly dominates the lower-cased text,
+    scoring at least twice the runner-up; otherwise 'unknown'.
+    """
+    scores = _score_status(text)
+    ranked = sorted(scores.values(), reverse=True) + [0, 0]
+    if ranked[0] < 2 * ranked[1]:
         return "unknown"
+    return _top_status(scores)
+
 
-    # Return the status with the highest score
+def _top_status(scores: dict) -> str:
+    """Return the status with the highest score, or 'unknown' if none matched."""
+    if not any(scores.values()):
+        return "unknown"
     return max(scores, key=scores.get)
 
 
+def _score_status(text: str) -> dict:
+    """Count keyword matches per status in lower-cased text."""
+    # Only run the patterns of buckets whose literal stems appear at all
+    candidates = tuple(
+        status
+        for status, stems in _STATUS_STEMS.items()
+        if any(stem in text for stem in stems)
+    )
+    if not candidates:
+        return {}
+
+    # Built in STATUS_PATTERNS order so ties resolve the same way every time
+    return {
+        status: sum(len(pattern.findall(text)) for pattern in _STATUS_RES[status])
+        for status in candidates
+    }
+
+
 def _clean_subject(subject: str) -> str:
     """Clean up the email subject line for use as a notification title."""
     # Remove common prefixes
-    subject = re.sub(r"^\s*\[Jules\]\s*", "", subject, flags=re.IGNORECASE)
-    subject = re.sub(r"^\s*Jules:\s*", "", subject, flags=re.IGNORECASE)
-    subject = re.sub(r"^\s*Google Jules\s*[-–—:]\s*", "", subject, flags=re.IGNORECASE)
+    subject = _SUBJECT_PREFIX_RE.sub("", subject, count=1)
 
     return subject.strip() or "Jules Notification"
 
 
 def _extract_repo(text: str, subject: str) -> str:
-    """Try to extract a repository name from the email."""
+    """
+    Try to extract a repository name from the email.
+    Expects text to be lower-cased; subject keeps its original case.
+    """
     # Look for GitHub-style repo references (owner/repo)
-    repo_patterns = [
-        r"(?:repository|repo)[:\s]+([a-zA-Z0-9_.-]+/[a-zA-Z0-9_.-]+)",
-        r"github\.com/([a-zA-Z0-9_.-]+/[a-zA-Z0-9_.-]+)",
-        r"([a-zA-Z0-9_.-]+/[a-zA-Z0-9_.-]+)(?:\s+repository)",
-    ]
-
-    for pattern in repo_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1)
+    match = _REPO_RE.search(text)
+    if match:
+        # A sentence-ending dot isn't part of the name
+        return (match.group(1) or match.group(2)).rstrip(".")
 
     # Check subject for repo-like pattern
-    match = re.search(r"([a-zA-Z0-9_.-]+/[a-zA-Z0-9_.-]+)", subject)
+    match = _SUBJECT_REPO_RE.search(subject)
     if match:
-        candidate = match.group(1)
+        candidate = match.group(1).rstrip(".")
         # Filter out obvious non-repo matches
         if "/" in candidate and not candidate.startswith("http"):
             return candidate
@@ -168,9 +288,8 @@ def _build_summary(snippet: str, body_text: str) -> str:
     """Build a concise summary from the email content."""
     # Prefer the snippet (Gmail's auto-generated preview)
     if snippet:
-        # Clean up HTML entities
-        summary = snippet.replace("&#39;", "'").replace("&quot;", '"')
-        summary = re.sub(r"&\w+;", "", summary)
+        # Decode HTML entities (&#39;, &quot;, &amp;, numeric refs, ...)
+        summary = unescape(snippet)
         return summary[:300]  # Cap at 300 chars for notification
 
     # Fall back to first meaningful lines of body
@@ -183,23 +302,14 @@ def _build_summary(snippet: str, body_text: str) -> str:
     return "New notification from Jules"
 
 
-def _extract_jules_link(html: str, text: str) -> str:
+def _extract_jules_link(links: list, text: str) -> str:
     """Extract a link to the Jules task from the email."""
-    # Try HTML first for accurate links
-    if html:
-        try:
-            soup = BeautifulSoup(html, "html.parser")
-            for link in soup.find_all("a", href=True):
-                href = link["href"]
-                if "jules" in href.lower() or "github.com" in href.lower():
-                    return href
-        except Exception:
-            pass
+    # Try HTML links first for accuracy
+    if links:
+        return links[0]
 
     # Fall back to URL regex in plain text
-    url_pattern = r"https?://[^\s<>\"')\]]+"
-    urls = re.findall(url_pattern, text)
-    for url in urls:
+    for url in _URL_RE.findall(text):
         if "jules" in url.lower() or "github.com" in url.lower():
             return url
 
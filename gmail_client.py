@@ -4,10 +4,14 @@ Gmail API client for monitoring and managing Jules notification emails.
 
 import os
 import base64
+from collections import deque
+
+import orjson
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.model import JsonModel
 
 # Full mailbox access needed to read, modify labels, and trash emails
 SCOPES = ["https://mail.google.com/"]
@@ -16,6 +20,29 @@ SCOPES = ["https://mail.google.com/"]
 TOKEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "token.json")
 CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "credentials.json")
 
+# Gmail rejects batch requests with more than 100 calls
+BATCH_SIZE = 100
+
+# Maximum number of message IDs accepted by a single batchModify call
+BATCH_MODIFY_SIZE = 1000
+
+# Headers requested when fetching messages in metadata format
+METADATA_HEADERS = ["Subject", "From", "Date"]
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that decodes API responses with orjson instead of stdlib json."""
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Let the stock model deal with non-JSON bodies
+            return super().deserialize(content)
+        if self._data_wrapper and isinstance(body, dict) and "data" in body:
+            body = body["data"]
+        return body
+
 
 class GmailClient:
     """Handles Gmail API authentication and email operations."""
@@ -23,6 +50,8 @@ class GmailClient:
     def __init__(self):
         self.service = None
         self.creds = None
+        # Mailbox history position after the last search, for delta checks
+        self._history_id = None
 
     def authenticate(self):
         """
@@ -58,10 +87,44 @@ class GmailClient:
             print("[Gmail] Token saved successfully.")
 
         self.creds = creds
-        self.service = build("gmail", "v1", credentials=creds)
+        self.service = build("gmail", "v1", credentials=creds, model=_OrjsonModel())
+        self._history_id = self._current_history_id()
         print("[Gmail] Authenticated successfully.")
         return self
 
+    def start_watch(self, topic_name: str, label_ids: list = None) -> dict:
+        """
+        Ask Gmail to publish mailbox changes to a Cloud Pub/Sub topic.
+        The watch expires after 7 days, so it must be renewed periodically.
+
+        Args:
+            topic_name: Full topic name, e.g. 'projects/my-project/topics/gmail'
+            label_ids: Only report changes to these labels (default: INBOX)
+
+        Returns:
+            Dict with 'historyId' and 'expiration', or {} on failure.
+        """
+        try:
+            response = self.service.users().watch(
+                userId="me",
+                body={"topicName": topic_name, "labelIds": label_ids or ["INBOX"]}
+            ).execute()
+            print(f"[Gmail] Watching mailbox via Pub/Sub topic {topic_name}.")
+            return response
+        except Exception as e:
+            print(f"[Gmail] Error starting mailbox watch: {e}")
+            return {}
+
+    def stop_watch(self) -> bool:
+        """Stop Gmail push notifications for this mailbox."""
+        try:
+            self.service.users().stop(userId="me").execute()
+            print("[Gmail] Mailbox watch stopped.")
+            return True
+        except Exception as e:
+            print(f"[Gmail] Error stopping mailbox watch: {e}")
+            return False
+
     def get_jules_emails(self, query: str) -> list:
         """
         Search for Jules notification emails matching the given query.
@@ -86,74 +149,182 @@ class GmailClient:
             print(f"[Gmail] Error searching emails: {e}")
             return []
 
-    def get_email_content(self, msg_id: str) -> dict:
+    def get_jules_emails_delta(self, query: str) -> list:
         """
-        Fetch the full content of an email by its message ID.
+        Like get_jules_emails(), but first asks the Gmail history API whether
+        any messages were added since the last check. The search itself only
+        runs when something new arrived, so idle polls cost one cheap call.
 
         Returns:
-            Dict with keys: id, subject, from, date, snippet, body_html, body_text
+            List of message metadata dicts with 'id' and 'threadId'.
         """
+        if not self._history_id:
+            self._history_id = self._current_history_id()
+            return self.get_jules_emails(query)
+
         try:
-            msg = self.service.users().messages().get(
+            response = self.service.users().history().list(
                 userId="me",
-                id=msg_id,
-                format="full"
+                startHistoryId=self._history_id,
+                historyTypes=["messageAdded"]
             ).execute()
+        except Exception as e:
+            # Typically a 404 when the stored historyId is too old
+            print(f"[Gmail] History lookup failed, running full search: {e}")
+            self._history_id = self._current_history_id()
+            return self.get_jules_emails(query)
+
+        # historyId is the mailbox's current position, present on every page
+        self._history_id = response.get("historyId", self._history_id)
+
+        if not response.get("history"):
+            return []
+        return self.get_jules_emails(query)
+
+    def _current_history_id(self) -> str:
+        """Fetch the mailbox's latest history ID, or None on failure."""
+        try:
+            profile = self.service.users().getProfile(userId="me").execute()
+            return profile.get("historyId")
+        except Exception as e:
+            print(f"[Gmail] Error fetching mailbox history ID: {e}")
+            return None
+
+    def get_email_metadata(self, msg_id: str) -> dict:
+        """
+        Fetch only the headers and snippet of an email by its message ID.
+        Much smaller than the full message; body_html and body_text are empty.
+
+        Returns:
+            Dict with keys: id, subject, from, date, snippet, body_html, body_text
+        """
+        return self._get_email(msg_id, "metadata")
 
-            headers = msg.get("payload", {}).get("headers", [])
-            header_map = {h["name"].lower(): h["value"] for h in headers}
+    def get_email_full(self, msg_id: str) -> dict:
+        """
+        Fetch the full content of an email by its message ID.
 
-            email_data = {
-                "id": msg["id"],
-                "thread_id": msg.get("threadId", ""),
-                "subject": header_map.get("subject", "(no subject)"),
-                "from": header_map.get("from", ""),
-                "date": header_map.get("date", ""),
-                "snippet": msg.get("snippet", ""),
-                "body_html": "",
-                "body_text": "",
-            }
+        Returns:
+            Dict with keys: id, subject, from, date, snippet, body_html, body_text
+        """
+        return self._get_email(msg_id, "full")
 
-            # Extract body from payload
-            payload = msg.get("payload", {})
-            email_data["body_html"], email_data["body_text"] = self._extract_body(payload)
+    def get_emails_content_batch(self, msg_ids: list, fmt: str = "full") -> list:
+        """
+        Fetch several emails in as few HTTP round trips as possible,
+        using Gmail batch requests.
 
-            return email_data
+        Args:
+            msg_ids: Gmail message IDs to fetch
+            fmt: 'full' for the whole message, 'metadata' for headers and snippet only
+
+        Returns:
+            List of email data dicts (see get_email_full), in the same
+            order as msg_ids. Emails that could not be fetched are {}.
+        """
+        results = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"[Gmail] Error fetching email {request_id}: {exception}")
+                return
+            results[request_id] = self._to_email_data(response)
+
+        for start in range(0, len(msg_ids), BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for msg_id in msg_ids[start:start + BATCH_SIZE]:
+                batch.add(self._get_request(msg_id, fmt), request_id=msg_id)
+            try:
+                batch.execute()
+            except Exception as e:
+                print(f"[Gmail] Error executing batch fetch: {e}")
+
+        return [results.get(msg_id, {}) for msg_id in msg_ids]
+
+    def _get_email(self, msg_id: str, fmt: str) -> dict:
+        """Fetch a single email in the given format and convert it."""
+        try:
+            msg = self._get_request(msg_id, fmt).execute()
+            return self._to_email_data(msg)
 
         except Exception as e:
             print(f"[Gmail] Error fetching email {msg_id}: {e}")
             return {}
 
+    def _get_request(self, msg_id: str, fmt: str):
+        """Build (but don't execute) a messages.get request."""
+        if fmt == "metadata":
+            return self.service.users().messages().get(
+                userId="me",
+                id=msg_id,
+                format="metadata",
+                metadataHeaders=METADATA_HEADERS,
+            )
+        return self.service.users().messages().get(
+            userId="me",
+            id=msg_id,
+            format="full"
+        )
+
+    def _to_email_data(self, msg: dict) -> dict:
+        """Convert a Gmail API message resource into an email data dict."""
+        headers = msg.get("payload", {}).get("headers", [])
+        header_map = {h["name"].lower(): h["value"] for h in headers}
+
+        email_data = {
+            "id": msg["id"],
+            "thread_id": msg.get("threadId", ""),
+            "subject": header_map.get("subject", "(no subject)"),
+            "from": header_map.get("from", ""),
+            "date": header_map.get("date", ""),
+            "snippet": msg.get("snippet", ""),
+            "body_html": "",
+            "body_text": "",
+        }
+
+        # Extract body from payload
+        payload = msg.get("payload", {})
+        email_data["body_html"], email_data["body_text"] = self._extract_body(payload)
+
+        return email_data
+
     def _extract_body(self, payload: dict) -> tuple:
         """
-        Recursively extract HTML and plain text body from email payload.
+        Extract HTML and plain text body from email payload.
+
+        Walks the MIME tree iteratively in document order (depth-first, so
+        nesting depth never hits the recursion limit). The last HTML and
+        plain text parts found win, and only those are decoded.
 
         Returns:
             Tuple of (html_body, text_body)
         """
-        html_body = ""
-        text_body = ""
+        html_data = ""
+        text_data = ""
+
+        stack = deque([payload])
+        while stack:
+            part = stack.pop()
 
-        mime_type = payload.get("mimeType", "")
+            body_data = part.get("body", {}).get("data", "")
+            if body_data:
+                mime_type = part.get("mimeType", "")
+                if "html" in mime_type:
+                    html_data = body_data
+                elif "plain" in mime_type:
+                    text_data = body_data
 
-        # Direct body data
-        body_data = payload.get("body", {}).get("data", "")
-        if body_data:
-            decoded = base64.urlsafe_b64decode(body_data).decode("utf-8", errors="replace")
-            if "html" in mime_type:
-                html_body = decoded
-            elif "plain" in mime_type:
-                text_body = decoded
+            # Push children reversed so they pop in their original order
+            stack.extend(reversed(part.get("parts", [])))
 
-        # Check parts recursively
-        for part in payload.get("parts", []):
-            part_html, part_text = self._extract_body(part)
-            if part_html:
-                html_body = part_html
-            if part_text:
-                text_body = part_text
+        return self._decode_part(html_data), self._decode_part(text_data)
 
-        return html_body, text_body
+    @staticmethod
+    def _decode_part(body_data: str) -> str:
+        """Decode a base64url-encoded MIME part body to text."""
+        if not body_data:
+            return ""
+        return base64.urlsafe_b64decode(body_data).decode("utf-8", errors="replace")
 
     def trash_email(self, msg_id: str) -> bool:
         """Move an email to trash."""
@@ -211,3 +382,74 @@ class GmailClient:
         else:
             print(f"[Gmail] Unknown cleanup action: {action}. Defaulting to trash.")
             return self.trash_email(msg_id)
+
+    def cleanup_emails(self, msg_ids: list, action: str) -> bool:
+        """
+        Perform the configured cleanup action on several emails at once.
+
+        'archive' and 'read' use batchModify (one call per 1000 emails).
+        Gmail has no batch trash endpoint (batchDelete is permanent), so
+        'trash' sends the per-email trash calls together in one batch request.
+
+        Args:
+            msg_ids: The Gmail message IDs
+            action: One of 'trash', 'archive', 'read'
+
+        Returns:
+            True if every email was cleaned up.
+        """
+        if not msg_ids:
+            return True
+
+        action = action.lower().strip()
+        if action == "trash":
+            return self._batch_trash(msg_ids)
+        elif action == "archive":
+            return self._batch_remove_labels(msg_ids, ["INBOX"], "archived")
+        elif action == "read":
+            return self._batch_remove_labels(msg_ids, ["UNREAD"], "marked as read")
+        else:
+            print(f"[Gmail] Unknown cleanup action: {action}. Defaulting to trash.")
+            return self._batch_trash(msg_ids)
+
+    def _batch_remove_labels(self, msg_ids: list, label_ids: list, description: str) -> bool:
+        """Remove labels from many emails using batchModify."""
+        try:
+            for start in range(0, len(msg_ids), BATCH_MODIFY_SIZE):
+                self.service.users().messages().batchModify(
+                    userId="me",
+                    body={
+                        "ids": msg_ids[start:start + BATCH_MODIFY_SIZE],
+                        "removeLabelIds": label_ids,
+                    }
+                ).execute()
+            print(f"[Gmail] {len(msg_ids)} email(s) {description}.")
+            return True
+        except Exception as e:
+            print(f"[Gmail] Error updating emails ({description}): {e}")
+            return False
+
+    def _batch_trash(self, msg_ids: list) -> bool:
+        """Move many emails to trash using batched trash calls."""
+        failed = set()
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"[Gmail] Error trashing email {request_id}: {exception}")
+                failed.add(request_id)
+
+        messages = self.service.users().messages()
+        for start in range(0, len(msg_ids), BATCH_SIZE):
+            chunk = msg_ids[start:start + BATCH_SIZE]
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for msg_id in chunk:
+                batch.add(messages.trash(userId="me", id=msg_id), request_id=msg_id)
+            try:
+                batch.execute()
+            except Exception as e:
+                print(f"[Gmail] Error executing batch trash: {e}")
+                failed.update(chunk)
+
+        trashed = len(msg_ids) - len(failed)
+        print(f"[Gmail] {trashed} email(s) moved to trash.")
+        return not failed
@@ -15,6 +15,7 @@ import sys
 import time
 import signal
 import argparse
+import threading
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -22,6 +23,7 @@ from dotenv import load_dotenv
 from gmail_client import GmailClient
 from email_parser import parse_jules_email
 from notifier import Notifier
+from pubsub_listener import PubSubListener
 
 
 # ─── Configuration ──────────────────────────────────────────────
@@ -34,8 +36,11 @@ def load_config() -> dict:
         "ntfy_topic": os.getenv("NTFY_TOPIC", ""),
         "ntfy_server": os.getenv("NTFY_SERVER", "https://ntfy.sh"),
         "poll_interval": int(os.getenv("POLL_INTERVAL", "30")),
+        "max_poll_interval": int(os.getenv("MAX_POLL_INTERVAL", "600")),
         "email_action": os.getenv("EMAIL_ACTION", "trash"),
         "gmail_query": os.getenv("GMAIL_QUERY", "from:jules-notifications@google.com is:unread"),
+        "pubsub_topic": os.getenv("PUBSUB_TOPIC", ""),
+        "pubsub_subscription": os.getenv("PUBSUB_SUBSCRIPTION", ""),
     }
 
     # Validate required settings
@@ -55,6 +60,10 @@ def load_config() -> dict:
 
 # ─── Main Loop ──────────────────────────────────────────────────
 
+# Gmail watches expire after 7 days; Google recommends renewing daily
+WATCH_RENEW_SECONDS = 24 * 60 * 60
+
+
 class JulesMonitor:
     """Main application class that ties everything together."""
 
@@ -68,6 +77,15 @@ class JulesMonitor:
         self.running = True
         self.processed_count = 0
 
+        # Run the full Gmail search (rather than a history delta check) on the
+        # first pass and whenever emails were left unprocessed for a retry
+        self._full_search = True
+
+        # Set by the Pub/Sub listener when Gmail pushes a mailbox change
+        self.new_mail = threading.Event()
+        self.listener = None
+        self._watch_renewed_at = 0.0
+
         # Set up graceful shutdown
         signal.signal(signal.SIGINT, self._shutdown)
         signal.signal(signal.SIGTERM, self._shutdown)
@@ -82,7 +100,8 @@ class JulesMonitor:
         self._print_banner()
         self.gmail.authenticate()
         print(f"[Monitor] Monitoring Gmail with query: {self.config['gmail_query']}")
-        print(f"[Monitor] Poll interval: {self.config['poll_interval']}s")
+        print(f"[Monitor] Poll interval: {self.config['poll_interval']}s "
+              f"(backing off to {self.config['max_poll_interval']}s when idle)")
         print(f"[Monitor] Email cleanup action: {self.config['email_action']}")
         print(f"[Monitor] Notifications → ntfy topic: {self.config['ntfy_topic']}")
         print("-" * 60)
@@ -95,7 +114,13 @@ class JulesMonitor:
             Number of emails processed.
         """
         now = datetime.now().strftime("%H:%M:%S")
-        messages = self.gmail.get_jules_emails(self.config["gmail_query"])
+        if self._full_search:
+            messages = self.gmail.get_jules_emails(self.config["gmail_query"])
+        else:
+            messages = self.gmail.get_jules_emails_delta(self.config["gmail_query"])
+
+        # Until every email is handled, keep searching in full so failures are retried
+        self._full_search = bool(messages)
 
         if not messages:
             print(f"[{now}] No new Jules emails.")
@@ -104,64 +129,161 @@ class JulesMonitor:
         count = len(messages)
         print(f"[{now}] Found {count} Jules email(s)! Processing...")
 
-        processed = 0
-        for msg_meta in messages:
-            msg_id = msg_meta["id"]
+        # 1-2. Fetch and parse Jules notifications
+        msg_ids = [msg_meta["id"] for msg_meta in messages]
+        parsed_emails = self._fetch_and_parse(msg_ids)
 
-            # 1. Fetch full email content
-            email_data = self.gmail.get_email_content(msg_id)
-            if not email_data:
+        # 3. Build notification messages
+        notify_ids = []
+        notifications = []
+        for msg_id in msg_ids:
+            parsed = parsed_emails.get(msg_id)
+            if not parsed:
                 print(f"  [!] Could not fetch email {msg_id}, skipping.")
                 continue
 
-            # 2. Parse Jules notification
-            parsed = parse_jules_email(email_data)
             print(f"  → Status: {parsed['status']} | {parsed['title']}")
-
-            # 3. Build notification message
-            notif_message = self._build_notification_message(parsed)
-
-            # 4. Send push notification
-            sent = self.notifier.send_notification(
-                title=parsed["title"],
-                message=notif_message,
-                status=parsed["status"],
-                link=parsed.get("link", ""),
-            )
-
+            notify_ids.append(msg_id)
+            notifications.append({
+                "title": parsed["title"],
+                "message": self._build_notification_message(parsed),
+                "status": parsed["status"],
+                "link": parsed.get("link", ""),
+            })
+
+        # 4. Send push notifications concurrently
+        results = self.notifier.send_notifications(notifications)
+
+        cleanup_ids = []
+        for msg_id, sent in zip(notify_ids, results):
             if not sent:
                 print(f"  [!] Failed to send notification for {msg_id}, will retry next cycle.")
                 continue
+            cleanup_ids.append(msg_id)
 
-            # 5. Clean up email
-            self.gmail.cleanup_email(msg_id, self.config["email_action"])
-            processed += 1
-            self.processed_count += 1
+        processed = len(cleanup_ids)
+        self.processed_count += processed
+
+        # 5. Clean up all notified emails in one go. Emails left behind by a
+        # failed send or cleanup produce no new history, so only a full
+        # search will find them again.
+        cleaned = self.gmail.cleanup_emails(cleanup_ids, self.config["email_action"])
+        self._full_search = processed < count or not cleaned
 
         print(f"[{now}] Processed {processed}/{count} emails.")
         return processed
 
+    def _fetch_and_parse(self, msg_ids: list) -> dict:
+        """
+        Fetch and parse emails, downloading full bodies only when needed.
+
+        Headers and snippets are fetched first in one batch. Only emails whose
+        status can't be determined from those are re-fetched in full; the
+        others are notified with whatever link the snippet carries, if any.
+
+        Returns:
+            Dict mapping message ID to parsed email data.
+        """
+        parsed_emails = {}
+        metadata = self.gmail.get_emails_content_batch(msg_ids, fmt="metadata")
+        for msg_id, email_data in zip(msg_ids, metadata):
+            if email_data:
+                parsed_emails[msg_id] = parse_jules_email(email_data)
+
+        full_ids = [
+            msg_id for msg_id, parsed in parsed_emails.items()
+            if parsed["status"] == "unknown"
+        ]
+        if full_ids:
+            full = self.gmail.get_emails_content_batch(full_ids, fmt="full")
+            for msg_id, email_data in zip(full_ids, full):
+                # Keep the metadata-based result if the full fetch failed
+                if email_data:
+                    parsed_emails[msg_id] = parse_jules_email(email_data)
+
+        return parsed_emails
+
     def run_loop(self):
-        """Run the continuous monitoring loop."""
+        """
+        Run the continuous monitoring loop.
+
+        The poll interval doubles after every check that finds no emails,
+        up to max_poll_interval, and resets as soon as emails arrive.
+        If Pub/Sub push is configured, Gmail change notifications wake the
+        loop immediately and polling only remains as a fallback.
+        """
         self.start()
+        interval = self.config["poll_interval"]
+        max_interval = max(self.config["max_poll_interval"], interval)
+
+        if self.config["pubsub_topic"] and self.config["pubsub_subscription"]:
+            self._start_push()
 
         while self.running:
             try:
-                self.check_once()
+                if self.listener:
+                    self._renew_watch_if_due()
+
+                if self.check_once() > 0:
+                    interval = self.config["poll_interval"]
+                else:
+                    interval = min(interval * 2, max_interval)
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 print(f"[Monitor] Error during check: {e}")
                 print("[Monitor] Will retry next cycle...")
 
-            # Sleep in small increments so shutdown is responsive
-            for _ in range(self.config["poll_interval"]):
+            # Sleep in small increments so shutdown and pushes are responsive
+            for _ in range(interval):
                 if not self.running:
                     break
-                time.sleep(1)
+                if self.new_mail.wait(1):
+                    self.new_mail.clear()
+                    break
 
+        self._stop_push()
         print("[Monitor] Goodbye!")
 
+    def _start_push(self):
+        """Start the Gmail watch and the Pub/Sub listener that wakes the loop."""
+        try:
+            self.listener = PubSubListener(self.config["pubsub_subscription"], self.new_mail).start()
+        except Exception as e:
+            print(f"[Monitor] Could not start Pub/Sub listener: {e}")
+            print("[Monitor] Falling back to polling only.")
+            self.listener = None
+            return
+
+        if self._renew_watch_if_due():
+            print(f"[Monitor] Push notifications via Pub/Sub topic: {self.config['pubsub_topic']}")
+        else:
+            print("[Monitor] Gmail watch could not be started; push is inactive and the watch "
+                  "will be retried every cycle (polling continues meanwhile).")
+
+    def _stop_push(self):
+        """Stop the Pub/Sub listener and the Gmail watch, if running."""
+        if not self.listener:
+            return
+        self.listener.stop()
+        self.listener = None
+        self.gmail.stop_watch()
+
+    def _renew_watch_if_due(self) -> bool:
+        """
+        (Re)register the Gmail watch once a day so it never expires.
+
+        Returns:
+            True if the watch is active, False if registering it failed
+            (it is retried on the next call).
+        """
+        if time.time() - self._watch_renewed_at < WATCH_RENEW_SECONDS:
+            return True
+        if not self.gmail.start_watch(self.config["pubsub_topic"]):
+            return False
+        self._watch_renewed_at = time.time()
+        return True
+
     def _build_notification_message(self, parsed: dict) -> str:
         """Build a human-readable notification message from parsed email data."""
         parts = []
@@ -3,7 +3,12 @@ Push notification sender using ntfy.sh.
 Sends Jules task notifications to your phone with appropriate priority, emoji, and actions.
 """
 
+import asyncio
+from urllib.parse import quote
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
 
 # Map Jules task statuses to ntfy priority levels and emoji tags
@@ -41,6 +46,12 @@ STATUS_CONFIG = {
 }
 
 
+USER_AGENT = "JulesNotif/1"
+
+# Seconds to wait for ntfy before giving up on a notification
+REQUEST_TIMEOUT = 10
+
+
 class Notifier:
     """Sends push notifications to phone via ntfy."""
 
@@ -56,6 +67,12 @@ class Notifier:
         self.server = server.rstrip("/")
         self.url = f"{self.server}/{self.topic}"
 
+        # Reuse one pooled keep-alive connection so bursts of notifications
+        # don't pay a fresh TCP + TLS handshake each time
+        self._session = requests.Session()
+        self._session.headers.update({"User-Agent": USER_AGENT})
+        self._session.mount(f"{self.server}/", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
     def send_notification(
         self,
         title: str,
@@ -75,6 +92,113 @@ class Notifier:
         Returns:
             True if sent successfully, False otherwise
         """
+        data, headers = self._build_request(title, message, status, link)
+
+        try:
+            response = self._session.post(
+                self.url,
+                data=data,
+                headers=headers,
+                timeout=REQUEST_TIMEOUT,
+            )
+            return self._handle_response(response.status_code, response.text, headers["Title"])
+
+        except requests.exceptions.Timeout:
+            print("[Notify] Notification send timed out.")
+            return False
+        except requests.exceptions.ConnectionError:
+            print(f"[Notify] Could not connect to ntfy server at {self.server}")
+            return False
+        except Exception as e:
+            print(f"[Notify] Unexpected error sending notification: {e}")
+            return False
+
+    async def send_notification_async(
+        self,
+        client: httpx.AsyncClient,
+        title: str,
+        message: str,
+        status: str = "unknown",
+        link: str = "",
+    ) -> bool:
+        """
+        Async version of send_notification, sent through the given httpx client.
+
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        try:
+            data, headers = self._build_request(title, message, status, link)
+
+            # httpx encodes str header values as ASCII; send latin-1 bytes so
+            # titles go out exactly as they do through requests
+            raw_headers = {key: value.encode("latin-1") for key, value in headers.items()}
+
+            response = await client.post(self.url, content=data, headers=raw_headers)
+            return self._handle_response(response.status_code, response.text, headers["Title"])
+
+        except httpx.TimeoutException:
+            print("[Notify] Notification send timed out.")
+            return False
+        except httpx.TransportError:
+            print(f"[Notify] Could not connect to ntfy server at {self.server}")
+            return False
+        except Exception as e:
+            print(f"[Notify] Unexpected error sending notification: {e}")
+            return False
+
+    def send_notifications(self, notifications: list) -> list:
+        """
+        Send several push notifications concurrently, so a burst takes
+        roughly one round trip instead of one per notification.
+
+        Args:
+            notifications: List of dicts with send_notification() keyword
+                arguments (title, message, status, link)
+
+        Returns:
+            List of booleans, one per notification, True if sent successfully
+        """
+        if not notifications:
+            return []
+
+        # A single notification gains nothing from an event loop
+        if len(notifications) == 1:
+            return [self.send_notification(**notifications[0])]
+
+        return asyncio.run(self._send_all(notifications))
+
+    async def _send_all(self, notifications: list) -> list:
+        """Send all notifications over one shared HTTP/2 client."""
+        async with httpx.AsyncClient(
+            http2=True,
+            headers={"User-Agent": USER_AGENT},
+            timeout=REQUEST_TIMEOUT,
+        ) as client:
+            results = await asyncio.gather(
+                *(
+                    self.send_notification_async(client, **notification)
+                    for notification in notifications
+                ),
+                return_exceptions=True,
+            )
+
+        # One bad notification must not fail the whole burst
+        sent = []
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"[Notify] Unexpected error sending notification: {result}")
+                result = False
+            sent.append(result)
+        return sent
+
+    def _build_request(self, title: str, message: str, status: str, link: str) -> tuple:
+        """
+        Build the ntfy request body and headers for a notification.
+
+        Returns:
+            Tuple of (body_bytes, headers)
+        """
         config = STATUS_CONFIG.get(status, STATUS_CONFIG["unknown"])
 
         # HTTP headers are latin-1 encoded, so strip any characters
@@ -90,36 +214,26 @@ class Notifier:
             "Tags": ",".join(config["tags"]),
         }
 
-        # Add click action if we have a link
+        # Add click action if we have a link. Percent-encode anything outside
+        # ASCII (e.g. non-Latin file names in GitHub URLs) so the header can
+        # be sent; existing escapes and URL delimiters are left untouched.
         if link:
+            link = quote(link, safe=":/?#[]@!$&'()*+,;=%~")
             headers["Click"] = link
             headers["Actions"] = f"view, Open in Browser, {link}"
 
-        try:
-            response = requests.post(
-                self.url,
-                data=full_message.encode("utf-8"),
-                headers=headers,
-                timeout=10,
-            )
+        return full_message.encode("utf-8"), headers
 
-            if response.status_code == 200:
-                print(f"[Notify] Notification sent: {safe_title}")
-                return True
-            else:
-                print(f"[Notify] Failed to send notification: HTTP {response.status_code}")
-                print(f"[Notify] Response: {response.text}")
-                return False
-
-        except requests.exceptions.Timeout:
-            print("[Notify] Notification send timed out.")
-            return False
-        except requests.exceptions.ConnectionError:
-            print(f"[Notify] Could not connect to ntfy server at {self.server}")
-            return False
-        except Exception as e:
-            print(f"[Notify] Unexpected error sending notification: {e}")
-            return False
+    @staticmethod
+    def _handle_response(status_code: int, text: str, safe_title: str) -> bool:
+        """Log the outcome of an ntfy publish and return whether it succeeded."""
+        if status_code == 200:
+            print(f"[Notify] Notification sent: {safe_title}")
+            return True
+
+        print(f"[Notify] Failed to send notification: HTTP {status_code}")
+        print(f"[Notify] Response: {text}")
+        return False
 
     @staticmethod
     def _make_header_safe(text: str) -> str:
@@ -0,0 +1,59 @@
+"""
+Cloud Pub/Sub listener for Gmail push notifications.
+Wakes the monitor as soon as Gmail reports a mailbox change instead of
+waiting for the next poll.
+"""
+
+import threading
+
+
+class PubSubListener:
+    """Streams Gmail change notifications from a Pub/Sub subscription."""
+
+    def __init__(self, subscription: str, new_mail: threading.Event):
+        """
+        Initialize the listener.
+
+        Args:
+            subscription: Full subscription name,
+                e.g. 'projects/my-project/subscriptions/gmail-sub'
+            new_mail: Event set whenever Gmail reports a mailbox change
+        """
+        self.subscription = subscription
+        self.new_mail = new_mail
+        self._subscriber = None
+        self._future = None
+
+    def start(self):
+        """
+        Start streaming pull in a background thread.
+        Uses Google Application Default Credentials for Pub/Sub access.
+        """
+        try:
+            from google.cloud import pubsub_v1
+        except ImportError as e:
+            raise ImportError(
+                "google-cloud-pubsub is required for Gmail push notifications.\n"
+                "Install it with: pip install google-cloud-pubsub"
+            ) from e
+
+        self._subscriber = pubsub_v1.SubscriberClient()
+        self._future = self._subscriber.subscribe(self.subscription, callback=self._on_message)
+        print(f"[PubSub] Listening on {self.subscription}")
+        return self
+
+    def stop(self):
+        """Stop streaming and release the subscriber."""
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+        if self._subscriber is not None:
+            self._subscriber.close()
+            self._subscriber = None
+
+    def _on_message(self, message):
+        """Acknowledge the push and wake the monitor loop."""
+        # The payload only carries the mailbox's new historyId;
+        # the monitor fetches the actual changes itself.
+        message.ack()
+        self.new_mail.set()